@@ -22,27 +22,31 @@ a doubly stochastic matrix into a convex combination of permutation matrices.
 """
 # Imports from built-in libraries.
 from __future__ import division
-import itertools
 
 # Imports from third-party libraries.
-from networkx import from_numpy_matrix
-from networkx.algorithms.bipartite.matching import maximum_matching
 import numpy as np
+from scipy.optimize import linear_sum_assignment
 
 #: The current version of this package.
 __version__ = '0.0.6.dev0'
 
-#: Any number smaller than this will be rounded down to 0 when computing the
-#: difference between NumPy arrays of floats.
-TOLERANCE = np.finfo(np.float).eps * 10.
+#: Relative tolerance used when computing the difference between NumPy arrays
+#: of floats with the default ``numpy.float64`` data type. Whenever subtracting
+#: a coefficient from an entry leaves less than this fraction of the entry's
+#: previous value, the entry is rounded down to 0. For other floating point
+#: data types, ten times the machine epsilon of that data type is used instead.
+TOLERANCE = np.finfo(np.float64).eps * 10.
 
 
 def to_permutation_matrix(matches):
     """Converts a permutation into a permutation matrix.
 
-    `matches` is a dictionary whose keys are vertices and whose values are
-    partners. For each vertex ``u`` and ``v``, entry (``u``, ``v``) in the
-    returned matrix will be a ``1`` if and only if ``matches[u] == v``.
+    `matches` is either a dictionary whose keys are vertices and whose values
+    are partners, or a one-dimensional array (or sequence) whose entry ``u`` is
+    the partner of ``u``, as returned by
+    :func:`birkhoff_von_neumann_permutations`. For each vertex ``u`` and
+    ``v``, entry (``u``, ``v``) in the returned matrix will be a ``1`` if and
+    only if ``matches[u] == v``.
 
     Pre-condition: `matches` must be a permutation on an initial subset of the
     natural numbers.
@@ -57,52 +61,16 @@ def to_permutation_matrix(matches):
     #     for (u, v) in matches.items():
     #         P[u, v] = 1
     #
-    P[list(zip(*(matches.items())))] = 1
+    if isinstance(matches, dict):
+        rows = np.fromiter(matches.keys(), dtype=int, count=n)
+        cols = np.fromiter(matches.values(), dtype=int, count=n)
+    else:
+        rows = np.arange(n)
+        cols = np.asarray(matches)
+    P[rows, cols] = 1
     return P
 
 
-def zeros(m, n):
-    """Convenience function for ``numpy.zeros((m, n))``."""
-    return np.zeros((m, n))
-
-
-def hstack(left, right):
-    """Convenience function for ``numpy.hstack((left, right))``."""
-    return np.hstack((left, right))
-
-
-def vstack(top, bottom):
-    """Convenience function for ``numpy.vstack((top, bottom))``."""
-    return np.vstack((top, bottom))
-
-
-def four_blocks(topleft, topright, bottomleft, bottomright):
-    """Convenience function that creates a block matrix with the specified
-    blocks.
-
-    Each argument must be a NumPy matrix. The two top matrices must have the
-    same number of rows, as must the two bottom matrices. The two left matrices
-    must have the same number of columns, as must the two right matrices.
-
-    """
-    return vstack(hstack(topleft, topright),
-                  hstack(bottomleft, bottomright))
-
-
-def to_bipartite_matrix(A):
-    """Returns the adjacency matrix of a bipartite graph whose biadjacency
-    matrix is `A`.
-
-    `A` must be a NumPy array.
-
-    If `A` has **m** rows and **n** columns, then the returned matrix has **m +
-    n** rows and columns.
-
-    """
-    m, n = A.shape
-    return four_blocks(zeros(m, m), A, A.T, zeros(n, n))
-
-
 def to_pattern_matrix(D):
     """Returns the Boolean matrix in the same shape as `D` with ones exactly
     where there are nonzero entries in `D`.
@@ -110,17 +78,129 @@ def to_pattern_matrix(D):
     `D` must be a NumPy array.
 
     """
-    result = np.zeros_like(D)
     # This is a cleverer way of doing
     #
+    #     result = np.zeros_like(D)
     #     for (u, v) in zip(*(D.nonzero())):
     #         result[u, v] = 1
     #
-    result[D.nonzero()] = 1
-    return result
+    return (D != 0).astype(D.dtype, copy=False)
 
 
-def birkhoff_von_neumann_decomposition(D):
+def birkhoff_von_neumann_permutations(D, dtype=np.float64):
+    """Returns the Birkhoff--von Neumann decomposition of the doubly
+    stochastic matrix `D`, with each permutation given as an array of
+    indices instead of a permutation matrix.
+
+    This function is like :func:`birkhoff_von_neumann_decomposition`, and
+    accepts the same arguments, but in each pair of the returned list the second
+    element is a one-dimensional NumPy array of integers of length ``n``
+    whose entry ``i`` is the column of the ``1`` in row ``i`` of the
+    permutation matrix. Since the decomposition may have up to ``n ** 2``
+    terms, this uses a factor of ``n`` less memory than returning the
+    permutation matrices themselves. Use :func:`to_permutation_matrix` to
+    convert one of these arrays into a permutation matrix.
+
+    For example::
+
+        >>> import numpy as np
+        >>> from birkhoff import birkhoff_von_neumann_permutations as decomp
+        >>> D = np.ones((2, 2))
+        >>> zipped_pairs = decomp(D)
+        >>> coefficients, permutations = zip(*zipped_pairs)
+        >>> coefficients
+        (1.0, 1.0)
+        >>> permutations[0]
+        array([0, 1])
+        >>> permutations[1]
+        array([1, 0])
+
+    """
+    m, n = D.shape
+    if m != n:
+        raise ValueError('Input matrix must be square ({} x {})'.format(m, n))
+    # Row indices used to gather the entries of S selected by a permutation.
+    rows = np.arange(n)
+    # These two lists will store the result as we build it up each iteration.
+    # Each permutation is stored as an array whose entry ``i`` is the column
+    # of the 1 in row ``i`` of the permutation matrix.
+    coefficients = []
+    permutations = []
+    # Create a copy of D so that we don't modify it directly. Cast the
+    # entries of the matrix to floating point numbers, regardless of
+    # whether they were integers.
+    S = D.astype(dtype)
+    # An entry is rounded down to 0 when subtracting a coefficient from it
+    # leaves less than this fraction of its previous value; see the
+    # documentation for `TOLERANCE`.
+    eps = np.finfo(dtype).eps
+    tolerance = TOLERANCE if S.dtype == np.float64 else eps * 10.
+    # Rounding the input to `dtype` and the subtractions below may leave a
+    # remainder with no perfect matching on its nonzero entries. Each row of
+    # that remainder sums to a few machine epsilons of the row sums of the
+    # input, so anything up to this bound is treated as rounding error.
+    leftover = n * eps * S.sum(axis=1).max(initial=0)
+    # A perfect matching in the bipartite graph whose biadjacency matrix has
+    # an edge exactly where the matrix S has a nonzero entry is the same as
+    # an assignment of rows to columns of zero cost, where each zero entry of
+    # S costs one. Entries of S only ever change from nonzero to zero, so
+    # this cost matrix is built once and then updated as entries vanish.
+    cost = np.where(S != 0, 0.0, 1.0)
+    # Keep track of the number of nonzero entries remaining in S, so that we
+    # know when to stop without checking every entry of S.
+    nnz = np.count_nonzero(S)
+    while nnz > 0:
+        # Compute a perfect matching on the nonzero entries of S. Entry ``i``
+        # of `perm` is the column assigned to row ``i``.
+        if nnz == n:
+            # If S has exactly ``n`` nonzero entries, it can only be a scaled
+            # permutation matrix, so read the permutation directly off its
+            # nonzero entries instead of solving an assignment problem.
+            _, perm = S.nonzero()
+            is_permutation = len(np.unique(perm)) == n
+        else:
+            _, perm = linear_sum_assignment(cost)
+            is_permutation = True
+        # If the best assignment uses a zero entry of S, then there is no
+        # perfect matching on the nonzero entries.
+        if not is_permutation or np.any(cost[rows, perm]):
+            # PRECISION ISSUE: Rounding errors accumulated over many
+            # subtractions may leave behind small entries that no longer
+            # form a scaled doubly stochastic matrix. Those are not part of
+            # the decomposition, so discard them; anything larger means the
+            # input was not a scaled doubly stochastic matrix to begin with.
+            if S.sum(axis=1).max() <= leftover:
+                break
+            raise ValueError('Input matrix must be a scalar multiple of a'
+                             ' doubly stochastic matrix')
+        # Get the smallest entry of S corresponding to the 1 entries in the
+        # permutation matrix. Gather those entries once, since they are also
+        # the only entries that change below.
+        vals = S[rows, perm]
+        q = vals.min()
+        threshold = tolerance * vals
+        # Store the coefficient and the permutation for later.
+        coefficients.append(q)
+        permutations.append(perm)
+        # Subtract the permutation matrix scaled by q. After this subtraction,
+        # S has a zero entry where the value q used to live. Only the ``n``
+        # entries selected by the permutation change, so update just those
+        # entries instead of the whole matrix.
+        vals -= q
+        # PRECISION ISSUE: There seems to be a problem with floating point
+        # precision here, so we need to round down to 0 any entry that is very
+        # small relative to its value before the subtraction.
+        vals[np.abs(vals) < threshold] = 0.0
+        S[rows, perm] = vals
+        # Remove the edges for the entries that just became zero. Each of the
+        # entries selected by the permutation was nonzero before the update.
+        zeroed = vals == 0
+        cost[rows[zeroed], perm[zeroed]] = 1.0
+        nnz -= np.count_nonzero(zeroed)
+    return list(zip(coefficients, permutations))
+
+
+def birkhoff_von_neumann_decomposition(D, dtype=np.float64):
     """Returns the Birkhoff--von Neumann decomposition of the doubly
     stochastic matrix `D`.
 
@@ -177,61 +257,26 @@ def birkhoff_von_neumann_decomposition(D):
     The returned list of pairs is given in the order computed by the algorithm
     (so in particular they are not sorted in any way).
 
+    `dtype` is the floating point data type used to compute the
+    decomposition, and the data type of the returned coefficients and
+    permutation matrices. ``numpy.float32`` may be used instead of the
+    default ``numpy.float64``, at the cost of precision. Entries that become
+    small enough to be rounding errors (see :data:`TOLERANCE`) are rounded
+    down to 0, and if only a remainder of a few machine epsilons is left when
+    no further permutation can be found, it is left out of the decomposition
+    instead of causing an error.
+
+    If you do not need the permutation matrices themselves, use
+    :func:`birkhoff_von_neumann_permutations` instead, which represents each
+    permutation using far less memory.
+
     """
-    m, n = D.shape
-    if m != n:
-        raise ValueError('Input matrix must be square ({} x {})'.format(m, n))
-    indices = list(itertools.product(range(m), range(n)))
-    # These two lists will store the result as we build it up each iteration.
-    coefficients = []
-    permutations = []
-    # Create a copy of D so that we don't modify it directly. Cast the
-    # entries of the matrix to floating point numbers, regardless of
-    # whether they were integers.
-    S = D.astype('float')
-    while not np.all(S == 0):
-        # Create an undirected graph whose adjacency matrix contains a 1
-        # exactly where the matrix S has a nonzero entry.
-        W = to_pattern_matrix(S)
-        # Construct the bipartite graph whose left and right vertices both
-        # represent the vertex set of the pattern graph (whose adjacency matrix
-        # is ``W``).
-        X = to_bipartite_matrix(W)
-        # Convert the matrix of a bipartite graph into a NetworkX graph object.
-        G = from_numpy_matrix(X)
-        # Compute a perfect matching for this graph. The dictionary `M` has one
-        # entry for each matched vertex (in both the left and the right vertex
-        # sets), and the corresponding value is its partner.
-        #
-        # The bipartite maximum matching algorithm requires specifying
-        # the left set of nodes in the bipartite graph. By construction,
-        # the left set of nodes is {0, ..., n - 1} and the right set is
-        # {n, ..., 2n - 1}; see `to_bipartite_matrix()`.
-        left_nodes = range(n)
-        M = maximum_matching(G, left_nodes)
-        # However, since we have both a left vertex set and a right vertex set,
-        # each representing the original vertex set of the pattern graph
-        # (``W``), we need to convert any vertex greater than ``n`` to its
-        # original vertex number. To do this,
-        #
-        #   - ignore any keys greater than ``n``, since they are already
-        #     covered by earlier key/value pairs,
-        #   - ensure that all values are less than ``n``.
-        #
-        M = {u: v % n for u, v in M.items() if u < n}
-        # Convert that perfect matching to a permutation matrix.
-        P = to_permutation_matrix(M)
-        # Get the smallest entry of S corresponding to the 1 entries in the
-        # permutation matrix.
-        q = min(S[i, j] for (i, j) in indices if P[i, j] == 1)
-        # Store the coefficient and the permutation matrix for later.
-        coefficients.append(q)
-        permutations.append(P)
-        # Subtract P scaled by q. After this subtraction, S has a zero entry
-        # where the value q used to live.
-        S -= q * P
-        # PRECISION ISSUE: There seems to be a problem with floating point
-        # precision here, so we need to round down to 0 any entry that is very
-        # small.
-        S[np.abs(S) < TOLERANCE] = 0.0
-    return list(zip(coefficients, permutations))
+    pairs = birkhoff_von_neumann_permutations(D, dtype=dtype)
+    n = len(D)
+    # Convert all of the permutations to permutation matrices at once.
+    permutations = np.array([perm for _, perm in pairs], dtype=np.intp)
+    permutations = permutations.reshape(len(pairs), n)
+    k = len(permutations)
+    matrices = np.zeros((k, n, n), dtype=dtype)
+    matrices[np.arange(k)[:, np.newaxis], np.arange(n), permutations] = 1
+    return [(q, P) for (q, _), P in zip(pairs, matrices)]
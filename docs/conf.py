@@ -285,9 +285,8 @@ texinfo_documents = [
 # Example configuration for intersphinx: refer to the Python standard library.
 intersphinx_mapping = {
     'http://docs.python.org/': None,
-#    'http://networkx.github.io/documentation/latest/': None,
     'http://docs.scipy.org/doc/numpy/': None,
-#    'http://docs.scipy.org/doc/scipy/reference/': None,
+    'http://docs.scipy.org/doc/scipy/reference/': None,
     }
 
 # Configuration for issuetracker extension.
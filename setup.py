@@ -26,7 +26,7 @@
 from setuptools import setup
 
 #: Installation requirements.
-requirements = ['numpy', 'networkx>=2.0']
+requirements = ['numpy>=1.17', 'scipy>=1.4']
 
 
 setup(
@@ -44,8 +44,6 @@ setup(
     name='birkhoff',
     platforms='any',
     py_modules=['birkhoff'],
-    test_suite='nose.collector',
-    tests_require=['nose'],
     url='https://github.com/jfinkels/birkhoff',
     version='0.0.6.dev0',
     zip_safe=False
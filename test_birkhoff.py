@@ -19,52 +19,144 @@
 """Unit tests for the :mod:`birkhoff` module.
 
 """
-# Imports from built-in packages.
-from __future__ import division
-
 # Imports from third-party packages.
 import numpy as np
-from nose.tools import raises
+import pytest
 
 # Imports from this package.
 from birkhoff import birkhoff_von_neumann_decomposition
+from birkhoff import birkhoff_von_neumann_permutations
+from birkhoff import to_permutation_matrix
+
+
+def perm_key(P):
+    """Returns the permutation represented by the permutation matrix `P`
+    as a tuple whose entry ``i`` is the column of the 1 in row ``i``.
+
+    """
+    return tuple(np.argmax(P, axis=1).tolist())
 
 
-def as_list(iterable_of_arrays):
-    """Converts an iterable of permutation matrices given as NumPy
-    arrays into a list of lists.
+def sorted_pairs(coefficients, permutations):
+    """Returns a list of pairs of the form ``(perm_key(P), c)``, one for
+    each coefficient ``c`` and corresponding permutation matrix ``P``,
+    sorted by permutation.
 
     """
-    return [array.tolist() for array in iterable_of_arrays]
+    return sorted(zip(map(perm_key, permutations), coefficients))
+
+
+def as_arrays(pairs):
+    """Converts a list of pairs of coefficients and permutation matrices
+    into a one-dimensional NumPy array of coefficients and a
+    three-dimensional NumPy array of the permutation matrices.
+
+    """
+    coefficients = np.fromiter((c for c, _ in pairs), dtype=np.float64,
+                               count=len(pairs))
+    permutations = np.stack([P for _, P in pairs])
+    return coefficients, permutations
+
+
+def reconstruct(coefficients, permutations):
+    """Returns the sum of the permutation matrices `permutations`, each
+    scaled by the corresponding entry of `coefficients`.
+
+    """
+    return np.einsum('i,ijk->jk', np.asarray(coefficients),
+                     np.stack(permutations))
+
+
+def random_doubly_stochastic(n, rng):
+    """Returns a random `n` by `n` doubly stochastic matrix.
+
+    The matrix is a random convex combination of `n` permutation matrices
+    chosen uniformly at random using the NumPy random number generator
+    `rng`.
+
+    """
+    coefficients = rng.random(n)
+    coefficients /= coefficients.sum()
+    D = np.zeros((n, n))
+    for c in coefficients:
+        D[np.arange(n), rng.permutation(n)] += c
+    return D
 
 
-@raises(ValueError)
 def test_non_square_matrix():
-    birkhoff_von_neumann_decomposition(np.zeros((1, 2)))
+    with pytest.raises(ValueError):
+        birkhoff_von_neumann_decomposition(np.zeros((1, 2)))
+
+
+def test_empty_matrix():
+    assert birkhoff_von_neumann_decomposition(np.zeros((0, 0))) == []
+
+
+def test_zero_matrix():
+    assert birkhoff_von_neumann_decomposition(np.zeros((3, 3))) == []
+
+
+def test_not_doubly_stochastic():
+    with pytest.raises(ValueError):
+        birkhoff_von_neumann_decomposition(np.array([[1, 1], [0, 0]]))
+
+
+def test_not_doubly_stochastic_single_column():
+    with pytest.raises(ValueError):
+        birkhoff_von_neumann_decomposition(np.array([[1, 0], [1, 0]]))
+
+
+def test_permutation_matrix():
+    """Tests that the decomposition of a scaled permutation matrix is
+    that permutation matrix alone.
+
+    """
+    D = np.array([[0, 0, 2], [2, 0, 0], [0, 2, 0]])
+    actual = birkhoff_von_neumann_decomposition(D)
+    assert len(actual) == 1
+    coefficient, permutation = actual[0]
+    assert coefficient == 2
+    np.testing.assert_array_equal(2 * permutation, D)
 
 
 def test_birkhoff_von_neumann_decomposition():
-    D = (1 / 6) * np.array([[1, 4, 0, 1],
-                            [2, 1, 3, 0],
-                            [2, 1, 1, 2],
-                            [1, 0, 2, 3]])
-    P1 = np.array([[0, 0, 0, 1], [0, 0, 1, 0], [0, 1, 0, 0], [1, 0, 0, 0]])
-    P2 = np.identity(4)
-    P3 = np.array([[0, 1, 0, 0], [1, 0, 0, 0], [0, 0, 0, 1], [0, 0, 1, 0]])
-    P4 = np.array([[0, 1, 0, 0], [0, 0, 1, 0], [1, 0, 0, 0], [0, 0, 0, 1]])
+    # Keep the integer numerators of the entries of D, so that the
+    # reconstruction can also be checked exactly.
+    N = np.array([[1, 4, 0, 1],
+                  [2, 1, 3, 0],
+                  [2, 1, 1, 2],
+                  [1, 0, 2, 3]], dtype=np.int64)
+    D = N / 6
+    # Each permutation matrix is the identity matrix with its rows permuted.
+    I = np.eye(4, dtype=np.int64)
+    P1 = I[[3, 2, 1, 0]]
+    P2 = I
+    P3 = I[[1, 0, 3, 2]]
+    P4 = I[[1, 2, 0, 3]]
     expected_coefficients = [1 / 6, 1 / 6, 1 / 3, 1 / 3]
     expected_permutations = [P1, P2, P3, P4]
-    actual = birkhoff_von_neumann_decomposition(D)
-    actual_coefficients, actual_permutations = zip(*actual)
-    assert sorted(actual_coefficients) == sorted(expected_coefficients)
-    # Convert the permutation matrices into a list of lists for easy sorting.
-    expected_permutations = as_list(expected_permutations)
-    actual_permutations = as_list(actual_permutations)
-    assert sorted(actual_permutations) == sorted(expected_permutations)
+    actual = list(birkhoff_von_neumann_decomposition(D))
+    actual_coefficients, actual_permutations = as_arrays(actual)
+    reconstructed = reconstruct(actual_coefficients, actual_permutations)
+    # Compare each coefficient together with the permutation it scales, with
+    # the permutation matrices given by the permutations they represent.
+    actual_pairs = sorted_pairs(actual_coefficients, actual_permutations)
+    expected_pairs = sorted_pairs(expected_coefficients, expected_permutations)
+    assert [k for k, _ in actual_pairs] == [k for k, _ in expected_pairs]
+    np.testing.assert_allclose([c for _, c in actual_pairs],
+                               [c for _, c in expected_pairs])
     # Now that we know the coefficients and permutations are as we expected,
     # let's double check that the doubly stochastic matrix is actually the sum
     # of the scaled permutation matrices.
-    assert np.all(D == sum(c * P for c, P in actual))
+    np.testing.assert_allclose(D, reconstructed, rtol=0, atol=1e-12)
+    # Each coefficient is a multiple of 1 / 6, so the decomposition can also
+    # be checked exactly by reconstructing the numerators in integers.
+    numerators = np.rint(6 * actual_coefficients)
+    np.testing.assert_allclose(6 * actual_coefficients, numerators)
+    reconstructed_numerators = np.einsum(
+        'i,ijk->jk', numerators.astype(np.int64),
+        actual_permutations.astype(np.int64))
+    np.testing.assert_array_equal(N, reconstructed_numerators)
 
 
 def test_scaled():
@@ -78,19 +170,90 @@ def test_scaled():
                   [2, 1, 3, 0],
                   [2, 1, 1, 2],
                   [1, 0, 2, 3]])
-    P1 = np.array([[0, 0, 0, 1], [0, 0, 1, 0], [0, 1, 0, 0], [1, 0, 0, 0]])
-    P2 = np.identity(4)
-    P3 = np.array([[0, 1, 0, 0], [1, 0, 0, 0], [0, 0, 0, 1], [0, 0, 1, 0]])
-    P4 = np.array([[0, 1, 0, 0], [0, 0, 1, 0], [1, 0, 0, 0], [0, 0, 0, 1]])
+    # Each permutation matrix is the identity matrix with its rows permuted.
+    I = np.eye(4, dtype=np.int64)
+    P1 = I[[3, 2, 1, 0]]
+    P2 = I
+    P3 = I[[1, 0, 3, 2]]
+    P4 = I[[1, 2, 0, 3]]
     expected_coefficients = [1, 1, 2, 2]
     expected_permutations = [P1, P2, P3, P4]
-    actual = birkhoff_von_neumann_decomposition(D)
-    actual_coefficients, actual_permutations = zip(*actual)
-    assert sorted(actual_coefficients) == sorted(expected_coefficients)
-    expected_permutations = as_list(expected_permutations)
-    actual_permutations = as_list(actual_permutations)
-    assert sorted(actual_permutations) == sorted(expected_permutations)
+    actual = list(birkhoff_von_neumann_decomposition(D))
+    actual_coefficients, actual_permutations = as_arrays(actual)
+    reconstructed = reconstruct(actual_coefficients, actual_permutations)
+    # Compare each coefficient together with the permutation it scales, with
+    # the permutation matrices given by the permutations they represent.
+    actual_pairs = sorted_pairs(actual_coefficients, actual_permutations)
+    expected_pairs = sorted_pairs(expected_coefficients, expected_permutations)
+    assert [k for k, _ in actual_pairs] == [k for k, _ in expected_pairs]
+    np.testing.assert_allclose([c for _, c in actual_pairs],
+                               [c for _, c in expected_pairs])
     # Now that we know the coefficients and permutations are as we expected,
     # let's double check that the doubly stochastic matrix is actually the sum
     # of the scaled permutation matrices.
-    assert np.all(D == sum(c * P for c, P in actual))
+    np.testing.assert_allclose(D, reconstructed, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+@pytest.mark.parametrize('n', [4, 8, 16, 32, 64])
+def test_random(benchmark, n, dtype):
+    """Tests for computing the Birkhoff decomposition of random doubly
+    stochastic matrices of increasing size, in both double and single
+    precision.
+
+    """
+    D = random_doubly_stochastic(n, np.random.default_rng(n))
+    actual = benchmark(birkhoff_von_neumann_decomposition, D, dtype=dtype)
+    assert len(actual) <= n ** 2
+    actual_coefficients, actual_permutations = as_arrays(actual)
+    assert np.all(actual_coefficients > 0)
+    reconstructed = reconstruct(actual_coefficients, actual_permutations)
+    # Nothing but rounding error may be lost, however large the matrix.
+    atol = 100 * np.finfo(dtype).eps
+    np.testing.assert_allclose(actual_coefficients.sum(), 1, rtol=0,
+                               atol=atol)
+    np.testing.assert_allclose(D, reconstructed, rtol=0, atol=atol)
+
+
+def test_float32():
+    """Tests for computing the Birkhoff decomposition in single
+    precision.
+
+    """
+    D = np.array([[1, 4, 0, 1],
+                  [2, 1, 3, 0],
+                  [2, 1, 1, 2],
+                  [1, 0, 2, 3]]) / 6
+    actual = birkhoff_von_neumann_decomposition(D, dtype=np.float32)
+    assert len(actual) == 4
+    actual_coefficients, actual_permutations = zip(*actual)
+    for c, P in actual:
+        assert c.dtype == np.float32
+        assert P.dtype == np.float32
+    reconstructed = reconstruct(actual_coefficients, actual_permutations)
+    np.testing.assert_allclose(D, reconstructed, rtol=1e-6)
+
+
+def test_permutations():
+    """Tests for computing the Birkhoff decomposition with each
+    permutation given as an array of indices.
+
+    """
+    D = np.array([[1, 4, 0, 1],
+                  [2, 1, 3, 0],
+                  [2, 1, 1, 2],
+                  [1, 0, 2, 3]])
+    expected_coefficients = [1, 1, 2, 2]
+    expected_permutations = [[3, 2, 1, 0], [0, 1, 2, 3], [1, 0, 3, 2],
+                             [1, 2, 0, 3]]
+    actual = birkhoff_von_neumann_permutations(D)
+    # Compare each coefficient together with the permutation it scales.
+    actual_pairs = sorted((tuple(p.tolist()), c) for c, p in actual)
+    expected_pairs = sorted(zip(map(tuple, expected_permutations),
+                                expected_coefficients))
+    assert [k for k, _ in actual_pairs] == [k for k, _ in expected_pairs]
+    np.testing.assert_allclose([c for _, c in actual_pairs],
+                               [c for _, c in expected_pairs])
+    # The permutations must agree with the permutation matrices.
+    reconstructed = sum(c * to_permutation_matrix(p) for c, p in actual)
+    np.testing.assert_array_equal(D, reconstructed)